@@ -4,9 +4,19 @@
 
 import datetime
 import hashlib
+import heapq
+import json
+import mmap
 import os
+import string
+import struct
+import sys
+import tempfile
+import threading
 import time
-from typing import Callable, Dict, List, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 from xml.dom import minidom
 
 import requests
@@ -26,7 +36,86 @@ QUERY_COUNT = {
     "recursive_loc": 0,
     "graph_commits": 0,
     "loc_query": 0,
+    "fingerprint_getter": 0,
 }
+QUERY_COUNT_LOCK = threading.Lock()  # Tasks run concurrently in task_runner
+
+# Set STREAM_CACHE=1 to reconcile the cache page by page with bounded memory,
+# for accounts with too many repositories to hold in memory at once
+STREAM_CACHE = os.environ.get("STREAM_CACHE", "") == "1"
+
+# Page size of each paginated query type: (minimum, maximum, starting size)
+# Larger repository pages give a 502 timeout error and smaller ones send too many requests,
+# so the sizes are tuned from observed latency and errors, then kept in the cache
+PAGE_SIZE_LIMITS = {
+    "repositories": (10, 100, 60),
+    "history": (10, 100, 100),
+    "fingerprint": (10, 100, 60),
+}
+PAGE_SIZES = {}
+# Query type -> [page size, unix time] of the last failure, pages grow no closer to it
+# than PAGE_SIZE_STEP, and the ceiling rises by PAGE_SIZE_CEILING_DECAY a day
+PAGE_SIZE_CEILINGS = {}
+PAGE_SIZES_LOCK = threading.Lock()
+PAGE_SIZE_STEP = 10
+PAGE_SIZE_CEILING_DECAY = 10
+# GitHub gives up on a query after 10 seconds
+PAGE_SIZE_TARGET_LATENCY = 4
+REQUEST_TIMEOUT = 30
+REQUEST_RETRIES = 3
+REQUEST_RETRY_DELAY = 2  # seconds, multiplied by the attempt number
+
+# Cards rendered from the stats snapshot, each slot maps a tspan index (see svg_element_getter)
+# or tspan id to a format string of stat names:
+# age, repos, contrib, commits, stars, followers, loc_total, loc_add, loc_del,
+# commits_week (commits made in the last 7 days, from the history)
+# Light or compact variants only need their own entry here, changing this list
+# changes the stored fingerprint so the next run renders every card in full
+SVG_TEMPLATES = [
+    {
+        "filename": "dark_mode.svg",
+        "slots": {
+            31: "{age}",
+            67: "{repos}",
+            69: "{contrib}",
+            71: "{commits}",
+            73: "{stars}",
+            75: "{followers}",
+            77: "{loc_total}",
+            78: "{loc_add}++",
+            79: "{loc_del}--",
+        },
+    },
+]
+
+# One fixed-width record per run, appended to cache/<hash>_history.bin:
+# unix time, LOC added, LOC deleted, commits, stars, followers, repos, contributed repos
+HISTORY_FIELDS = (
+    "timestamp",
+    "loc_add",
+    "loc_del",
+    "commits",
+    "stars",
+    "followers",
+    "repos",
+    "contrib",
+)
+HISTORY_RECORD = struct.Struct("<I2Q5I")
+
+CACHE_COMMENT = (
+    "This is a cache of all of the repositories I own, have contributed to, or am a member of."
+    "\n\n"
+    "repository (hashed)  total commits  my commits  LOC added by me  LOC deleted by me"
+    "\n"
+    "         \                \                \           \__________________  \________"
+    "\n"
+    "          \                \                \________________________     \          \\"
+    "\n"
+    "           \                \___________________________________     \     \          \\"
+    "\n"
+    "____________\___________________________________________________\_____\_____\__________\__________"
+    "\n"
+)
 
 
 def query_count(funct_id: str):
@@ -34,7 +123,36 @@ def query_count(funct_id: str):
     Counts how many times the GitHub GraphQL API is called
     """
     global QUERY_COUNT
-    QUERY_COUNT[funct_id] += 1
+    with QUERY_COUNT_LOCK:
+        QUERY_COUNT[funct_id] += 1
+
+
+def cache_filename(suffix: str = ".txt") -> str:
+    """Returns the location of a cache file unique to the user
+
+    Args:
+        suffix (str, optional): Suffix appended to the hashed user name. Defaults to ".txt".
+
+    Returns:
+        str: Location of the cache file
+    """
+    return (
+        "cache/"
+        + hashlib.sha256(USER_NAME.encode("utf-8")).hexdigest()
+        + suffix
+    )
+
+
+def query_count_report():
+    """
+    Prints how many times each function called the GitHub GraphQL API
+    """
+    print(
+        "Total GitHub GraphQL API calls:",
+        "{:>3}".format(sum(QUERY_COUNT.values())),
+    )
+    for funct_name, count in QUERY_COUNT.items():
+        print("{:<28}".format("   " + funct_name + ":"), "{:>6}".format(count))
 
 
 def perf_counter(funct: Callable, *args):
@@ -47,6 +165,57 @@ def perf_counter(funct: Callable, *args):
     return funct_return, time.perf_counter() - start
 
 
+def task_runner(
+    tasks: Dict[str, Tuple[Callable, List[str]]], max_workers: int = 8
+) -> Tuple[Dict, Dict[str, float], float]:
+    """Runs a graph of tasks, starting each one as soon as its dependencies have finished
+    Independent tasks run concurrently, since most of them just wait on the GitHub API
+
+    Args:
+        tasks (Dict[str, Tuple[Callable, List[str]]]): Task name -> (function, names of the tasks it depends on).
+            The function is called with the results of its dependencies, in the listed order
+        max_workers (int, optional): Maximum number of tasks running at once. Defaults to 8.
+
+    Raises:
+        Exception: Some tasks depend on a missing task or on each other
+
+    Returns:
+        Tuple[Dict, Dict[str, float], float]: Task results, time of each task, critical path time
+    """
+    results, times, finish_times = {}, {}, {}
+    pending = dict(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, (funct, dependencies) in list(pending.items()):
+                if all(dependency in results for dependency in dependencies):
+                    future = executor.submit(
+                        perf_counter,
+                        funct,
+                        *[results[dependency] for dependency in dependencies],
+                    )
+                    running[future] = name
+                    del pending[name]
+            if not running:
+                raise Exception(
+                    "task_runner() cannot resolve the dependencies of",
+                    list(pending),
+                )
+            done, __ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], times[name] = future.result()
+                # A task finishes after its slowest dependency chain plus its own time
+                finish_times[name] = times[name] + max(
+                    [
+                        finish_times[dependency]
+                        for dependency in tasks[name][1]
+                    ],
+                    default=0,
+                )
+    return results, times, max(finish_times.values(), default=0)
+
+
 def formatter(
     query_type: str,
     difference: int,
@@ -136,6 +305,173 @@ def simple_request(
     )
 
 
+def page_size_reader():
+    """
+    Loads the page sizes and failure ceilings learned by previous runs, falling back to the starting sizes
+    """
+    try:
+        with open(cache_filename("_page_sizes.json"), "r") as f:
+            learned = json.load(f)
+    except (FileNotFoundError, ValueError):
+        learned = {}
+    with PAGE_SIZES_LOCK:
+        for query_type, (minimum, maximum, start) in PAGE_SIZE_LIMITS.items():
+            size = learned.get("sizes", {}).get(query_type, start)
+            PAGE_SIZES[query_type] = min(max(int(size), minimum), maximum)
+            if query_type in learned.get("ceilings", {}):
+                PAGE_SIZE_CEILINGS[query_type] = learned["ceilings"][
+                    query_type
+                ]
+
+
+def page_size_writer():
+    """
+    Stores the learned page sizes for the next run, leaving the file untouched if they did not change
+    """
+    filename = cache_filename("_page_sizes.json")
+    learned = {"sizes": PAGE_SIZES, "ceilings": PAGE_SIZE_CEILINGS}
+    try:
+        with open(filename, "r") as f:
+            if json.load(f) == learned:
+                return
+    except (FileNotFoundError, ValueError):
+        pass
+    with open(filename, "w") as f:
+        json.dump(learned, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+
+def page_size(query_type: str) -> int:
+    """Returns the current page size of a query type
+
+    Args:
+        query_type (str): Key of PAGE_SIZE_LIMITS
+
+    Returns:
+        int: Number of nodes to request per page
+    """
+    if not PAGE_SIZES:
+        page_size_reader()
+    return PAGE_SIZES[query_type]
+
+
+def page_size_ceiling(query_type: str) -> float:
+    """Returns the page size a query type is known to fail at
+    The ceiling rises by PAGE_SIZE_CEILING_DECAY for every full day since the failure,
+    since a failure may have been a bad day on GitHub
+
+    Args:
+        query_type (str): Key of PAGE_SIZE_LIMITS
+
+    Returns:
+        float: Failing page size, or infinity if the query type never failed
+    """
+    if query_type not in PAGE_SIZE_CEILINGS:
+        return float("inf")
+    size, failed_at = PAGE_SIZE_CEILINGS[query_type]
+    days = (time.time() - failed_at) // (24 * 3600)
+    return size + PAGE_SIZE_CEILING_DECAY * days
+
+
+def page_size_feedback(
+    query_type: str, size: int, failed: bool, latency: float = 0
+):
+    """Tunes the page size of a query type from the outcome of one request
+    Halves it after an error or timeout and remembers the size that first failed as a ceiling,
+    shrinks it when the query was slow, and grows it slowly back towards the ceiling while queries stay fast
+
+    Args:
+        query_type (str): Key of PAGE_SIZE_LIMITS
+        size (int): Page size the request was sent with
+        failed (bool): Whether the request gave a 502/504 or timed out
+        latency (float, optional): Duration of the request in seconds. Defaults to 0.
+    """
+    minimum, maximum, __ = PAGE_SIZE_LIMITS[query_type]
+    with PAGE_SIZES_LOCK:
+        current = PAGE_SIZES[query_type]
+        ceiling = page_size_ceiling(query_type)
+        failed_size = PAGE_SIZE_CEILINGS.get(query_type, [float("inf")])[0]
+        if failed:
+            # Only the size that first failed is a ceiling, the smaller retries
+            # of the same burst of errors must not ratchet it down to the minimum
+            if query_type not in PAGE_SIZE_CEILINGS or size >= failed_size:
+                PAGE_SIZE_CEILINGS[query_type] = [size, int(time.time())]
+            current = min(current, size // 2)
+        elif size >= failed_size:
+            # The ceiling has decayed past a size that now works
+            del PAGE_SIZE_CEILINGS[query_type]
+        elif latency > PAGE_SIZE_TARGET_LATENCY:
+            current = current * 3 // 4
+        elif current + PAGE_SIZE_STEP < ceiling:
+            current += PAGE_SIZE_STEP
+        PAGE_SIZES[query_type] = min(max(current, minimum), maximum)
+
+
+def adaptive_request(
+    func_name: str,
+    query_type: str,
+    query: str,
+    variables: Dict,
+    check: bool = True,
+) -> requests.Response:
+    """Sends a paginated query with the current page size of its type as the `$first` variable
+    502/504 responses and timeouts shrink the page size and retry the request after a short delay
+
+    Args:
+        func_name (str): The name of the function which invoke this function
+        query_type (str): Key of PAGE_SIZE_LIMITS
+        query (str): Query
+        variables (Dict): A dictionary of variable
+        check (bool, optional): Raise like simple_request if the response does not succeed. Defaults to True.
+
+    Raises:
+        Exception: The request still timed out after all retries, if check is True
+        Exception: A string describe information of error, if check is True
+
+    Returns:
+        requests.Response: Response object, or None if it timed out and check is False
+    """
+    for attempt in range(REQUEST_RETRIES + 1):
+        if attempt:  # Give GitHub a moment, and count the retry as an API call
+            time.sleep(REQUEST_RETRY_DELAY * attempt)
+            query_count(func_name)
+        size = variables["first"] = page_size(query_type)
+        start = time.perf_counter()
+        try:
+            response = requests.post(
+                "https://api.github.com/graphql",
+                json={"query": query, "variables": variables},
+                headers=HEADERS,
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.exceptions.Timeout:
+            page_size_feedback(query_type, size, True)
+            if attempt == REQUEST_RETRIES:
+                if not check:
+                    return None
+                raise Exception(
+                    func_name, " has timed out", QUERY_COUNT, PAGE_SIZES
+                )
+            continue
+        if response.status_code in (502, 504):
+            page_size_feedback(query_type, size, True)
+            continue
+        if response.status_code == 200:
+            page_size_feedback(
+                query_type, size, False, time.perf_counter() - start
+            )
+        break
+    if response.status_code == 200 or not check:
+        return response
+    raise Exception(
+        func_name,
+        " has failed with a",
+        response.status_code,
+        response.text,
+        QUERY_COUNT,
+    )
+
+
 def user_getter(username: str) -> Dict:
     """Get the account ID and creation time of the user
 
@@ -281,6 +617,118 @@ def graph_repos_stars(
             )
 
 
+def fingerprint_getter(username: str) -> Tuple[int, int, int, int, int]:
+    """Uses GitHub's GraphQL v4 API to fetch a cheap fingerprint of my account activity
+    Any follower, repository, star or commit change also changes the fingerprint,
+    so an unchanged fingerprint means the full pipeline would produce the same card.
+    Contributed repositories are paged in a loop with an adaptive page size of their own,
+    since this query is lighter than loc_query. Followers and owned repositories are only
+    selected on the first page.
+
+    Args:
+        username (str): User name
+
+    Returns:
+        Tuple[int, int, int, int, int]: Followers, my repos, contributed repos, stars, sum of history totalCount
+    """
+    query = """
+    query ($login: String!, $cursor: String, $first: Int!, $first_page: Boolean!) {
+        user(login: $login) {
+            followers @include(if: $first_page) {
+                totalCount
+            }
+            owned: repositories(first: 100, ownerAffiliations: [OWNER]) @include(if: $first_page) {
+                totalCount
+                edges {
+                    node {
+                        ... on Repository {
+                            stargazers {
+                                totalCount
+                            }
+                        }
+                    }
+                }
+            }
+            contributed: repositories(first: $first, after: $cursor, ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]) {
+                totalCount
+                edges {
+                    node {
+                        ... on Repository {
+                            defaultBranchRef {
+                                target {
+                                    ... on Commit {
+                                        history {
+                                            totalCount
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+                pageInfo {
+                    endCursor
+                    hasNextPage
+                }
+            }
+        }
+    }"""
+    fingerprint, cursor = None, None
+    while True:
+        query_count("fingerprint_getter")
+        variables = {
+            "login": username,
+            "cursor": cursor,
+            "first_page": fingerprint is None,
+        }
+        response = adaptive_request(
+            fingerprint_getter.__name__, "fingerprint", query, variables
+        )
+        user = response.json()["data"]["user"]
+
+        # Account-wide counters only need the first page
+        if fingerprint is None:
+            fingerprint = [
+                user["followers"]["totalCount"],
+                user["owned"]["totalCount"],
+                user["contributed"]["totalCount"],
+                stars_counter(user["owned"]["edges"]),
+                0,
+            ]
+        for node in user["contributed"]["edges"]:
+            if node["node"]["defaultBranchRef"] != None:  # Skip empty repos
+                fingerprint[4] += node["node"]["defaultBranchRef"]["target"][
+                    "history"
+                ]["totalCount"]
+
+        if not user["contributed"]["pageInfo"]["hasNextPage"]:
+            return tuple(fingerprint)
+        cursor = user["contributed"]["pageInfo"]["endCursor"]
+
+
+def fingerprint_reader() -> Tuple[int, ...]:
+    """Reads the fingerprint stored by the last complete run
+
+    Returns:
+        Tuple[int, ...]: Stored fingerprint, or an empty tuple if there is none
+    """
+    try:
+        with open(cache_filename("_fingerprint.txt"), "r") as f:
+            return tuple(int(value) for value in f.read().split())
+    except (FileNotFoundError, ValueError):
+        return ()
+
+
+def fingerprint_writer(fingerprint: Tuple[int, ...]):
+    """Stores the fingerprint so the next run can detect whether anything changed
+
+    Args:
+        fingerprint (Tuple[int, ...]): Fingerprint returned by fingerprint_getter
+    """
+    with open(cache_filename("_fingerprint.txt"), "w") as f:
+        f.write(" ".join(str(value) for value in fingerprint) + "\n")
+
+
 def flush_cache(edges: List[Dict], filename: str, comment_size: int = 7):
     """Wipes the cache file
     This is called when the number of repositories changes or when the file is first created
@@ -313,6 +761,7 @@ def flush_cache(edges: List[Dict], filename: str, comment_size: int = 7):
 def recursive_loc(
     owner: str,
     repo_name: str,
+    owner_id: Dict,
     data: Dict,
     cache_comment: str,
     addition_total: int = 0,
@@ -320,11 +769,13 @@ def recursive_loc(
     my_commits: int = 0,
     cursor: str = None,
 ) -> Tuple[int, int, int]:
-    """Uses GitHub's GraphQL v4 API and cursor pagination to fetch 100 commits from a repository at a time
+    """Uses GitHub's GraphQL v4 API and cursor pagination to fetch commits from a repository, one adaptive page at a time
+    Pages are fetched in a loop, so the number of commits is not limited by the recursion depth at small page sizes
 
     Args:
         owner (str): Github username
         repo_name (str): Github repository
+        owner_id (Dict): Account ID of the user whose LOC is counted
         data (Dict): Crawled data
         cache_comment (str): Comment to store file
         addition_total (int, optional): Current number of addition LOC. Defaults to 0.
@@ -339,14 +790,13 @@ def recursive_loc(
     Returns:
         Tuple[int, int, int]: Number of addition LOC, deletion LOC, my commits
     """
-    query_count("recursive_loc")
     query = """
-    query ($repo_name: String!, $owner: String!, $cursor: String) {
+    query ($repo_name: String!, $owner: String!, $cursor: String, $first: Int!) {
         repository(name: $repo_name, owner: $owner) {
             defaultBranchRef {
                 target {
                     ... on Commit {
-                        history(first: 100, after: $cursor) {
+                        history(first: $first, after: $cursor) {
                             totalCount
                             edges {
                                 node {
@@ -372,100 +822,78 @@ def recursive_loc(
             }
         }
     }"""
-    variables = {"repo_name": repo_name, "owner": owner, "cursor": cursor}
-    response = requests.post(
-        "https://api.github.com/graphql",
-        json={"query": query, "variables": variables},
-        headers=HEADERS,
-    )  # I cannot use simple_request(), because I want to save the file before raising Exception
-    if response.status_code == 200:
-        if (
-            response.json()["data"]["repository"]["defaultBranchRef"] != None
-        ):  # Only count commits if repo isn't empty
-            print("loc_counter_one_repo")
-            return loc_counter_one_repo(
-                owner,
-                repo_name,
-                data,
-                cache_comment,
-                response.json()["data"]["repository"]["defaultBranchRef"][
-                    "target"
-                ]["history"],
-                addition_total,
-                deletion_total,
-                my_commits,
+    while True:
+        query_count("recursive_loc")
+        variables = {"repo_name": repo_name, "owner": owner, "cursor": cursor}
+        response = adaptive_request(
+            recursive_loc.__name__, "history", query, variables, False
+        )  # I cannot raise on failure, because I want to save the file before raising Exception
+        if response is None or response.status_code != 200:
+            # The streaming mode never leaves the cache half written
+            if data is not None:
+                force_close_file(
+                    data, cache_comment
+                )  # saves what is currently in the file before this program crashes
+            if response is None:
+                raise Exception(
+                    "recursive_loc() has timed out", QUERY_COUNT, PAGE_SIZES
+                )
+            if response.status_code == 403:
+                raise Exception(
+                    "Too many requests in a short amount of time!\nYou've hit the non-documented anti-abuse limit!"
+                )
+            raise Exception(
+                "recursive_loc() has failed with a",
+                response.status_code,
+                response.text,
+                QUERY_COUNT,
             )
-        else:
+
+        branch = response.json()["data"]["repository"]["defaultBranchRef"]
+        if branch == None:  # Only count commits if repo isn't empty
             return 0
-    force_close_file(
-        data, cache_comment
-    )  # saves what is currently in the file before this program crashes
-    if response.status_code == 403:
-        raise Exception(
-            "Too many requests in a short amount of time!\nYou've hit the non-documented anti-abuse limit!"
+        print("loc_counter_one_repo")
+        history = branch["target"]["history"]
+        addition_total, deletion_total, my_commits = loc_counter_one_repo(
+            owner_id, history, addition_total, deletion_total, my_commits
         )
-    raise Exception(
-        "recursive_loc() has failed with a",
-        response.status_code,
-        response.text,
-        QUERY_COUNT,
-    )
+        if history["edges"] == [] or not history["pageInfo"]["hasNextPage"]:
+            return addition_total, deletion_total, my_commits
+        print("recursive_loc")
+        cursor = history["pageInfo"]["endCursor"]
 
 
 def loc_counter_one_repo(
-    owner: str,
-    repo_name: str,
-    data: Dict,
-    cache_comment: str,
+    owner_id: Dict,
     history: Dict,
     addition_total: int,
     deletion_total: int,
     my_commits: int,
 ) -> Tuple[int, int, int]:
     """
-    Recursively call recursive_loc (since GraphQL can only search 100 commits at a time)
-    only adds the LOC value of commits authored by me
+    Adds the LOC value of the commits authored by me in one page of history
+    (since GraphQL can only search up to 100 commits at a time)
     """
     for node in history["edges"]:
-        if node["node"]["author"]["user"] == OWNER_ID:
+        if node["node"]["author"]["user"] == owner_id:
             my_commits += 1
             addition_total += node["node"]["additions"]
             deletion_total += node["node"]["deletions"]
-
-    if history["edges"] == [] or not history["pageInfo"]["hasNextPage"]:
-        return addition_total, deletion_total, my_commits
-    else:
-        print("recursive_loc")
-        return recursive_loc(
-            owner,
-            repo_name,
-            data,
-            cache_comment,
-            addition_total,
-            deletion_total,
-            my_commits,
-            history["pageInfo"]["endCursor"],
-        )
+    return addition_total, deletion_total, my_commits
 
 
-def loc_query(
-    owner_affiliation: List[str],
-    comment_size: int = 0,
-    force_cache: bool = False,
-    cursor: str = None,
-    edges: List[Dict] = [],
-):
+def loc_query_page(owner_affiliation: List[str], cursor: str = None) -> Dict:
     """
-    Uses GitHub's GraphQL v4 API to query all the repositories I have access to (with respect to owner_affiliation)
-    Queries 60 repos at a time, because larger queries give a 502 timeout error and smaller queries send too many
-    requests and also give a 502 error.
-    Returns the total number of lines of code in all repositories
+    Uses GitHub's GraphQL v4 API to query one page of the repositories I have access to (with respect to owner_affiliation)
+    The page size adapts between runs, because larger queries give a 502 timeout error and smaller queries send
+    too many requests and also give a 502 error.
+    Returns the repositories connection of that page
     """
     query_count("loc_query")
     query = """
-    query ($owner_affiliation: [RepositoryAffiliation], $login: String!, $cursor: String) {
+    query ($owner_affiliation: [RepositoryAffiliation], $login: String!, $cursor: String, $first: Int!) {
         user(login: $login) {
-            repositories(first: 60, after: $cursor, ownerAffiliations: $owner_affiliation) {
+            repositories(first: $first, after: $cursor, ownerAffiliations: $owner_affiliation) {
             edges {
                 node {
                     ... on Repository {
@@ -494,44 +922,71 @@ def loc_query(
         "login": USER_NAME,
         "cursor": cursor,
     }
-    response = simple_request(loc_query.__name__, query, variables).json()
+    response = adaptive_request(
+        loc_query.__name__, "repositories", query, variables
+    )
+    return response.json()["data"]["user"]["repositories"]
+
 
-    if response["data"]["user"]["repositories"]["pageInfo"][
-        "hasNextPage"
-    ]:  # If repository data has another page
+def loc_query(
+    owner_affiliation: List[str],
+    owner_id: Dict,
+    comment_size: int = 0,
+    force_cache: bool = False,
+    cursor: str = None,
+    edges: List[Dict] = [],
+):
+    """
+    Queries all the repositories I have access to (with respect to owner_affiliation), one page at a time
+    Returns the total number of lines of code in all repositories
+    """
+    repositories = loc_query_page(owner_affiliation, cursor)
 
-        # Add on to the LoC count
-        edges += response["data"]["user"]["repositories"]["edges"]
+    # If repository data has another page, add on to the LoC count
+    if repositories["pageInfo"]["hasNextPage"]:
+        edges += repositories["edges"]
         return loc_query(
             owner_affiliation,
+            owner_id,
             comment_size,
             force_cache,
-            response["data"]["user"]["repositories"]["pageInfo"]["endCursor"],
+            repositories["pageInfo"]["endCursor"],
             edges,
         )
     else:
         return cache_builder(
-            edges + response["data"]["user"]["repositories"]["edges"],
+            edges + repositories["edges"],
+            owner_id,
             comment_size,
             force_cache,
         )
 
 
-def force_close_file(data: List[str], cache_comment: str):
+def loc_query_pages(owner_affiliation: List[str]) -> Iterator[List[Dict]]:
+    """
+    Yields the repositories I have access to (with respect to owner_affiliation) page by page,
+    so only one page of edges is held in memory at a time
+    """
+    cursor = None
+    while True:
+        repositories = loc_query_page(owner_affiliation, cursor)
+        yield repositories["edges"]
+        if not repositories["pageInfo"]["hasNextPage"]:
+            return
+        cursor = repositories["pageInfo"]["endCursor"]
+
+
+def force_close_file(data: List[str], cache_comment: List[str]):
     """Forces the file to close, preserving whatever data was written to it
     This is needed because if this function is called, the program would've crashed before the file is properly saved and closed
 
     Args:
         data (List[str]): Data of commit
-        cache_comment (str): Cache comment
+        cache_comment (List[str]): Lines of the cache comment
     """
-    filename = (
-        "cache/"
-        + hashlib.sha256(USER_NAME.encode("utf-8")).hexdigest()
-        + ".txt"
-    )
+    filename = cache_filename()
     with open(filename, "w") as f:
-        f.write(cache_comment)
+        f.writelines(cache_comment)
         f.writelines(data)
     print(
         "There was an error while writing to the cache file. The file,",
@@ -542,6 +997,7 @@ def force_close_file(data: List[str], cache_comment: str):
 
 def cache_builder(
     edges: List[Dict],
+    owner_id: Dict,
     comment_size: int = 7,
     force_cache: bool = False,
     loc_add: int = 0,
@@ -552,31 +1008,14 @@ def cache_builder(
     If it has, run recursive_loc on that repository to update the LOC count
     """
     cached = True  # Assume all repositories are cached
-    filename = (
-        "cache/"
-        + hashlib.sha256(USER_NAME.encode("utf-8")).hexdigest()
-        + ".txt"
-    )  # Create a unique filename for each user
+    filename = cache_filename()  # Create a unique filename for each user
     try:
         with open(filename, "r") as f:
             data = f.readlines()
     except FileNotFoundError:  # If the cache file doesn't exist, create it
         data = []
         if comment_size > 0:
-            data = (
-                "This is a cache of all of the repositories I own, have contributed to, or am a member of."
-                "\n\n"
-                "repository (hashed)  total commits  my commits  LOC added by me  LOC deleted by me"
-                "\n"
-                "         \                \                \           \__________________  \________"
-                "\n"
-                "          \                \                \________________________     \          \\"
-                "\n"
-                "           \                \___________________________________     \     \          \\"
-                "\n"
-                "____________\___________________________________________________\_____\_____\__________\__________"
-                "\n"
-            )
+            data = CACHE_COMMENT
         with open(filename, "w") as f:
             f.write(data)
 
@@ -590,6 +1029,24 @@ def cache_builder(
 
     cache_comment = data[:comment_size]  # save the comment block
     data = data[comment_size:]  # remove those lines
+    # Line the cached rows up with edges by repository hash,
+    # the streaming mode stores them sorted by hash instead of in API order
+    rows = {line[:64]: line for line in data}
+    data = []
+    for edge in edges:
+        repo_hash = hashlib.sha256(
+            edge["node"]["nameWithOwner"].encode("utf-8")
+        ).hexdigest()
+        if repo_hash not in rows:  # Counted from scratch below
+            cached = False
+        data.append(
+            rows.get(
+                repo_hash,
+                "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
+                    repo_hash, 0, 0, 0, 0
+                ),
+            )
+        )
     for index in range(len(edges)):
         repo_hash, commit_count, *__ = data[index].split()
         if (
@@ -598,33 +1055,38 @@ def cache_builder(
                 edges[index]["node"]["nameWithOwner"].encode("utf-8")
             ).hexdigest()
         ):
-            try:
-                if (
-                    int(commit_count)
-                    != edges[index]["node"]["defaultBranchRef"]["target"][
-                        "history"
-                    ]["totalCount"]
-                ):
-                    # if commit count has changed, update loc for that repo
-                    owner, repo_name = edges[index]["node"][
-                        "nameWithOwner"
-                    ].split("/")
-                    loc = recursive_loc(owner, repo_name, data, cache_comment)
-                    data[index] = "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
-                        repo_hash,
-                        str(
-                            edges[index]["node"]["defaultBranchRef"]["target"][
-                                "history"
-                            ]["totalCount"]
-                        ),
-                        str(loc[2]),
-                        str(loc[0]),
-                        str(loc[1]),
-                    )
-            except TypeError:  # If the repo is empty
+            if (
+                edges[index]["node"]["defaultBranchRef"] is None
+            ):  # If the repo is empty
                 data[index] = "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
                     repo_hash, 0, 0, 0, 0
                 )
+            elif (
+                int(commit_count)
+                != edges[index]["node"]["defaultBranchRef"]["target"][
+                    "history"
+                ]["totalCount"]
+            ):
+                # if commit count has changed, update loc for that repo
+                owner, repo_name = edges[index]["node"]["nameWithOwner"].split(
+                    "/"
+                )
+                loc = recursive_loc(
+                    owner, repo_name, owner_id, data, cache_comment
+                )
+                if not loc:  # Emptied since it was listed
+                    loc = (0, 0, 0)
+                data[index] = "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
+                    repo_hash,
+                    str(
+                        edges[index]["node"]["defaultBranchRef"]["target"][
+                            "history"
+                        ]["totalCount"]
+                    ),
+                    str(loc[2]),
+                    str(loc[0]),
+                    str(loc[1]),
+                )
     with open(filename, "w") as f:
         f.writelines(cache_comment)
         f.writelines(data)
@@ -635,33 +1097,404 @@ def cache_builder(
     return [loc_add, loc_del, loc_add - loc_del, cached]
 
 
-def svg_overwrite(
-    filename: str,
-    age_data: str,
-    commit_data: int,
-    star_data: int,
-    repo_data: int,
-    contrib_data: int,
-    follower_data: int,
-    loc_data: Tuple[int, int],
+def external_sort(
+    lines: Iterable[str], chunk_size: int = 10000
+) -> Iterator[str]:
+    """Sorts lines while holding at most chunk_size of them in memory
+    Each full chunk is sorted and spooled to a temporary file, then the chunks are merged lazily
+
+    Args:
+        lines (Iterable[str]): Lines to sort
+        chunk_size (int, optional): Number of lines sorted in memory at once. Defaults to 10000.
+
+    Yields:
+        str: Lines in sorted order
+    """
+    chunks = []
+    chunk = []
+    try:
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                spool = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+                spool.writelines(sorted(chunk))
+                spool.seek(0)
+                chunks.append(spool)
+                chunk = []
+        yield from heapq.merge(sorted(chunk), *chunks)
+    finally:
+        for spool in chunks:
+            spool.close()
+
+
+def cache_reader(filename: str, comment_size: int) -> Iterator[str]:
+    """Yields the repository lines of the cache file ordered by repository hash
+    Caches written by cache_builder follow the API order, so they are sorted once with external_sort
+
+    Args:
+        filename (str): Location of the cache file
+        comment_size (int): Number of comment lines
+
+    Yields:
+        str: Cache lines, sorted by repository hash
+    """
+    previous, is_sorted = "", True
+    with open(filename, "r") as f:
+        for index, line in enumerate(f):
+            if index >= comment_size and line.strip():
+                if line < previous:
+                    is_sorted = False
+                    break
+                previous = line
+    with open(filename, "r") as f:
+        lines = (
+            line
+            for index, line in enumerate(f)
+            if index >= comment_size and line.strip()
+        )
+        yield from lines if is_sorted else external_sort(lines)
+
+
+def cache_builder_stream(
+    pages: Iterable[List[Dict]],
+    owner_id: Dict,
+    comment_size: int = 7,
+    force_cache: bool = False,
+):
+    """
+    Streaming counterpart of cache_builder, with memory bounded by the page and chunk sizes
+    Repositories are sorted by hash as their pages arrive, then merge-joined against the hash-sorted cache file.
+    Only repositories whose commit count has changed are passed to recursive_loc.
+    The updated cache is written to a temporary file and swapped in atomically.
+    """
+    cached = True  # Assume all repositories are cached
+    loc_add, loc_del = 0, 0
+    filename = cache_filename()
+    cache_comment = CACHE_COMMENT if comment_size > 0 else ""
+    if os.path.exists(filename):
+        with open(filename, "r") as f:
+            cache_comment = "".join(f.readline() for __ in range(comment_size))
+        cached_lines = (
+            iter(()) if force_cache else cache_reader(filename, comment_size)
+        )
+    else:
+        cached_lines = iter(())
+
+    # One "<repo hash> <total commits or -> <nameWithOwner>" line per repository, sorted by hash
+    repos = external_sort(
+        "{} {} {}\n".format(
+            hashlib.sha256(
+                node["node"]["nameWithOwner"].encode("utf-8")
+            ).hexdigest(),
+            (
+                node["node"]["defaultBranchRef"]["target"]["history"][
+                    "totalCount"
+                ]
+                if node["node"]["defaultBranchRef"] != None
+                else "-"
+            ),
+            node["node"]["nameWithOwner"],
+        )
+        for page in pages
+        for node in page
+    )
+
+    error = None
+    cached_line = next(cached_lines, None)
+    previous_hash = None
+    with tempfile.NamedTemporaryFile(
+        mode="w", dir=os.path.dirname(filename), delete=False
+    ) as f:
+        try:
+            f.write(cache_comment)
+            for repo in repos:
+                repo_hash, commit_count, name_with_owner = repo.split()
+                # Repository listed twice across pages
+                if repo_hash == previous_hash:
+                    continue
+                previous_hash = repo_hash
+                # Skip cached repositories I no longer have access to
+                while cached_line is not None and cached_line[:64] < repo_hash:
+                    cached_line = next(cached_lines, None)
+                old_line = (
+                    cached_line
+                    if cached_line is not None
+                    and cached_line[:64] == repo_hash
+                    else None
+                )
+                if commit_count == "-":  # If the repo is empty
+                    line = "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
+                        repo_hash, 0, 0, 0, 0
+                    )
+                elif (
+                    old_line is not None
+                    and old_line.split()[1] == commit_count
+                ):
+                    line = old_line
+                elif error is not None:
+                    # Keep what is known after a failure, the repository is recounted next run
+                    if old_line is None:
+                        continue
+                    line = old_line
+                else:
+                    cached = False
+                    owner, repo_name = name_with_owner.split("/")
+                    try:
+                        loc = recursive_loc(
+                            owner, repo_name, owner_id, None, None
+                        )
+                    except Exception as exception:
+                        error = exception
+                        if old_line is None:
+                            continue
+                        line = old_line
+                    else:
+                        if not loc:  # Emptied since it was listed
+                            loc = (0, 0, 0)
+                        line = "{:<64} {:<5} {:<5} {:<10} {:<10}\n".format(
+                            repo_hash, commit_count, loc[2], loc[0], loc[1]
+                        )
+                values = line.split()
+                loc_add += int(values[3])
+                loc_del += int(values[4])
+                f.write(line)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, filename)
+    if error is not None:
+        print(
+            "There was an error while counting LOC. The file,",
+            filename,
+            "has had the partial data saved.",
+        )
+        raise error
+    return [loc_add, loc_del, loc_add - loc_del, cached]
+
+
+def loc_query_stream(
+    owner_affiliation: List[str],
+    owner_id: Dict,
+    comment_size: int = 0,
+    force_cache: bool = False,
 ):
     """
-    Parse SVG files and update elements with my age, commits, stars, repositories, and lines written
+    Streaming counterpart of loc_query, feeding repository pages to cache_builder_stream as they arrive
+    Returns the total number of lines of code in all repositories
+    """
+    return cache_builder_stream(
+        loc_query_pages(owner_affiliation), owner_id, comment_size, force_cache
+    )
+
+
+def svg_template_compiler(filename: str, slots: Dict) -> Tuple:
+    """Parses an SVG template and resolves its slots, so rendering only sets text nodes
+
+    Args:
+        filename (str): Location of the SVG file
+        slots (Dict): tspan index (as printed by svg_element_getter) or tspan id -> format string of stat names
+
+    Returns:
+        Tuple: Parsed document, list of (text node, format string, stat names) per slot
     """
     svg = minidom.parse(filename)
-    f = open(filename, mode="w", encoding="utf-8")
     tspan = svg.getElementsByTagName("tspan")
-    tspan[31].firstChild.data = age_data
-    tspan[67].firstChild.data = repo_data
-    tspan[69].firstChild.data = contrib_data
-    tspan[71].firstChild.data = commit_data
-    tspan[73].firstChild.data = star_data
-    tspan[75].firstChild.data = follower_data
-    tspan[77].firstChild.data = loc_data[2]
-    tspan[78].firstChild.data = loc_data[0] + "++"
-    tspan[79].firstChild.data = loc_data[1] + "--"
-    f.write(svg.toxml("utf-8").decode("utf-8"))
-    f.close()
+    ids = {node.getAttribute("id"): node for node in tspan}
+    nodes = []
+    for locator, template in slots.items():
+        node = tspan[locator] if isinstance(locator, int) else ids[locator]
+        fields = {
+            field
+            for __, field, __, __ in string.Formatter().parse(template)
+            if field
+        }
+        nodes.append((node.firstChild, template, fields))
+    return svg, nodes
+
+
+def svg_template_render(template: Dict, snapshot: Dict) -> bool:
+    """Fills the slots of one SVG template from the stats snapshot
+    Slots using a stat missing from the snapshot keep their current text,
+    and the file is only written when some slot text changed
+
+    Args:
+        template (Dict): Entry of SVG_TEMPLATES
+        snapshot (Dict): Stat name -> formatted value
+
+    Returns:
+        bool: Whether the file was rewritten
+    """
+    filename = template["filename"]
+    svg, nodes = svg_template_compiler(filename, template["slots"])
+    changed = False
+    for text, fmt, fields in nodes:
+        if fields <= snapshot.keys():
+            data = fmt.format(**snapshot)
+            if text.data != data:
+                text.data = data
+                changed = True
+    if changed:
+        with open(filename, mode="w", encoding="utf-8") as f:
+            f.write(svg.toxml("utf-8").decode("utf-8"))
+    return changed
+
+
+def svg_templates_fingerprint(templates: List[Dict]) -> int:
+    """Returns a number that changes whenever a template or its slots change
+    It is stored with the account fingerprint, so a new card is rendered in full on the next run
+
+    Args:
+        templates (List[Dict]): Entries of SVG_TEMPLATES
+
+    Returns:
+        int: First 8 bytes of the SHA-256 of the template list
+    """
+    return int(
+        hashlib.sha256(repr(templates).encode("utf-8")).hexdigest()[:16], 16
+    )
+
+
+def svg_templates_render(templates: List[Dict], snapshot: Dict) -> int:
+    """Renders every SVG template from a single stats snapshot, writing the files in parallel
+
+    Args:
+        templates (List[Dict]): Entries of SVG_TEMPLATES
+        snapshot (Dict): Stat name -> formatted value
+
+    Returns:
+        int: Number of rewritten files
+    """
+    with ThreadPoolExecutor() as executor:
+        return sum(
+            executor.map(
+                partial(svg_template_render, snapshot=snapshot), templates
+            )
+        )
+
+
+def history_append(stats: Dict[str, int], timestamp: int = None):
+    """Appends one record of my stats to the history file
+    Records are never rewritten, and timestamps never go backwards so the file stays sorted
+
+    Args:
+        stats (Dict[str, int]): Value of every field of HISTORY_FIELDS except timestamp
+        timestamp (int, optional): Unix time of the record. Defaults to now.
+    """
+    if timestamp is None:
+        timestamp = int(time.time())
+    with open(cache_filename("_history.bin"), "ab+") as f:
+        size = f.seek(0, os.SEEK_END)
+        size -= size % HISTORY_RECORD.size
+        f.truncate(size)  # Drop a record left half written by a crash
+        if size:
+            f.seek(size - HISTORY_RECORD.size)
+            last = HISTORY_RECORD.unpack(f.read(HISTORY_RECORD.size))
+            timestamp = max(timestamp, last[0])
+        f.write(
+            HISTORY_RECORD.pack(
+                timestamp, *[stats[field] for field in HISTORY_FIELDS[1:]]
+            )
+        )
+
+
+def history_bisect(data: mmap.mmap, timestamp: int) -> int:
+    """Returns the index of the first history record with a timestamp >= `timestamp`
+
+    Args:
+        data (mmap.mmap): Memory-mapped history file
+        timestamp (int): Unix time
+
+    Returns:
+        int: Record index, or the number of records if all are older
+    """
+    low, high = 0, len(data) // HISTORY_RECORD.size
+    while low < high:
+        middle = (low + high) // 2
+        if (
+            HISTORY_RECORD.unpack_from(data, middle * HISTORY_RECORD.size)[0]
+            < timestamp
+        ):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def history_range(start: int = 0, end: int = 2**32 - 1) -> List[Tuple]:
+    """Returns the history records with start <= timestamp <= end
+    The file is memory-mapped and the bounds are found by binary search,
+    so only the records in range are decoded
+
+    Args:
+        start (int, optional): Unix time of the first record. Defaults to 0.
+        end (int, optional): Unix time of the last record. Defaults to the end of time.
+
+    Returns:
+        List[Tuple]: Records in HISTORY_FIELDS order, oldest first
+    """
+    try:
+        with open(cache_filename("_history.bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size < HISTORY_RECORD.size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                first = history_bisect(data, start)
+                last = history_bisect(data, end + 1)
+                return list(
+                    HISTORY_RECORD.iter_unpack(
+                        data[
+                            first
+                            * HISTORY_RECORD.size : last
+                            * HISTORY_RECORD.size
+                        ]
+                    )
+                )
+    except FileNotFoundError:
+        return []
+
+
+def history_at(timestamp: int) -> Tuple:
+    """Returns my stats as of a given time, that is the last record at or before it
+    Runs without activity append nothing, so the last record still holds the values
+
+    Args:
+        timestamp (int): Unix time
+
+    Returns:
+        Tuple: Record in HISTORY_FIELDS order, or the oldest record if all are newer,
+            or an empty tuple without history
+    """
+    try:
+        with open(cache_filename("_history.bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size < HISTORY_RECORD.size:
+                return ()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                index = max(history_bisect(data, timestamp + 1) - 1, 0)
+                return HISTORY_RECORD.unpack_from(
+                    data, index * HISTORY_RECORD.size
+                )
+    except FileNotFoundError:
+        return ()
+
+
+def history_delta(field: str, since: int, current: int = None) -> int:
+    """Returns how much a stat changed since a given time, e.g. commits this week
+
+    Args:
+        field (str): Name in HISTORY_FIELDS
+        since (int): Unix time
+        current (int, optional): Current value, if it is not in the history yet. Defaults to the latest record.
+
+    Returns:
+        int: Current value minus the value at `since`, or 0 without history
+    """
+    index = HISTORY_FIELDS.index(field)
+    baseline = history_at(since)
+    if not baseline:
+        return 0
+    if current is None:
+        current = history_at(2**32 - 1)[index]
+    return current - baseline[index]
 
 
 def commit_counter(comment_size):
@@ -669,17 +1502,12 @@ def commit_counter(comment_size):
     Counts up my total commits, using the cache file created by cache_builder.
     """
     total_commits = 0
-    filename = (
-        "cache/"
-        + hashlib.sha256(USER_NAME.encode("utf-8")).hexdigest()
-        + ".txt"
-    )  # Use the same filename as cache_builder
+    filename = cache_filename()  # Use the same filename as cache_builder
     with open(filename, "r") as f:
-        data = f.readlines()
-    cache_comment = data[:comment_size]  # save the comment block
-    data = data[comment_size:]  # remove those lines
-    for line in data:
-        total_commits += int(line.split()[2])
+        # Read line by line, the cache may hold too many repositories for memory
+        for index, line in enumerate(f):
+            if index >= comment_size and line.strip():
+                total_commits += int(line.split()[2])
     return total_commits
 
 
@@ -699,85 +1527,123 @@ if __name__ == "__main__":
     Luu Van Duc Thieu (echodrift~zeno)
     """
     print("Calculation times:")
-    # define global variable for owner ID
-    OWNER_ID, user_time = perf_counter(user_getter, USER_NAME)
-    formatter("account data", user_time)
+    fingerprint, fingerprint_time = perf_counter(fingerprint_getter, USER_NAME)
+    formatter("fingerprint", fingerprint_time)
+    # A new or changed card has never been rendered with my stats
+    fingerprint += (svg_templates_fingerprint(SVG_TEMPLATES),)
     # ==========================================================================
     age_data, age_time = perf_counter(
         daily_readme, datetime.datetime(2003, 11, 29)
     )
     formatter("age calculation", age_time)
     # ==========================================================================
-    follower_data, follower_time = perf_counter(follower_getter, USER_NAME)
+    if fingerprint == fingerprint_reader():
+        # Nothing changed since the last run, only my age and the sliding
+        # weekly window need refreshing, both without any API call
+        svg_templates_render(
+            SVG_TEMPLATES,
+            {
+                "age": age_data,
+                "commits_week": "{:,}".format(
+                    history_delta("commits", int(time.time()) - 7 * 24 * 3600)
+                ),
+            },
+        )
+        print("No activity since the last run, skipped the full pipeline.")
+        query_count_report()
+        sys.exit(0)
+    # ==========================================================================
+    affiliations = ["OWNER", "COLLABORATOR", "ORGANIZATION_MEMBER"]
+    results, task_times, critical_time = task_runner(
+        {
+            "owner_id": (partial(user_getter, USER_NAME), []),
+            "followers": (partial(follower_getter, USER_NAME), []),
+            "stars": (partial(graph_repos_stars, "stars", ["OWNER"]), []),
+            "repos": (partial(graph_repos_stars, "repos", ["OWNER"]), []),
+            "contrib": (partial(graph_repos_stars, "repos", affiliations), []),
+            "loc": (
+                lambda owner_id: (
+                    loc_query_stream if STREAM_CACHE else loc_query
+                )(affiliations, owner_id, 7),
+                ["owner_id"],
+            ),
+            "commits": (lambda total_loc: commit_counter(7), ["loc"]),
+        }
+    )
+    formatter("account data", task_times["owner_id"])
     follower_data = formatter(
-        "follower counter", follower_time, follower_data, 4
+        "follower counter", task_times["followers"], results["followers"], 4
     )
-    # ==========================================================================
-    star_data, star_time = perf_counter(graph_repos_stars, "stars", ["OWNER"])
-    star_data = formatter("star counter", star_time, star_data)
-    # ==========================================================================
-    repo_data, repo_time = perf_counter(graph_repos_stars, "repos", ["OWNER"])
-    repo_data = formatter("my repositories", repo_time, repo_data, 2)
-    # ==========================================================================
-    contrib_data, contrib_time = perf_counter(
-        graph_repos_stars,
-        "repos",
-        ["OWNER", "COLLABORATOR", "ORGANIZATION_MEMBER"],
+    star_data = formatter(
+        "star counter", task_times["stars"], results["stars"]
     )
-    contrib_data = formatter("contributed repos", contrib_time, contrib_data, 2)
-    # ==========================================================================
-    # Fixing
-    total_loc, loc_time = perf_counter(
-        loc_query, ["OWNER", "COLLABORATOR", "ORGANIZATION_MEMBER"], 7
+    repo_data = formatter(
+        "my repositories", task_times["repos"], results["repos"], 2
     )
+    contrib_data = formatter(
+        "contributed repos", task_times["contrib"], results["contrib"], 2
+    )
+    total_loc = results["loc"]
+    stats = {
+        "loc_add": total_loc[0],
+        "loc_del": total_loc[1],
+        "commits": results["commits"],
+        "stars": results["stars"],
+        "followers": results["followers"],
+        "repos": results["repos"],
+        "contrib": results["contrib"],
+    }
     (
-        formatter("LOC (cached)", loc_time)
+        formatter("LOC (cached)", task_times["loc"])
         if total_loc[-1]
-        else formatter("LOC (no cache)", loc_time)
+        else formatter("LOC (no cache)", task_times["loc"])
     )
 
     for index in range(len(total_loc) - 1):
         total_loc[index] = "{:,}".format(
             total_loc[index]
         )  # format added, deleted, and total LOC
+    commit_data = formatter(
+        "commit counter", task_times["commits"], results["commits"], 7
+    )
     # ==========================================================================
-    commit_data, commit_time = perf_counter(commit_counter, 7)
-    commit_data = formatter("commit counter", commit_time, commit_data, 7)
-    # ==========================================================================
-    svg_overwrite(
-        "dark_mode.svg",
-        age_data,
-        commit_data,
-        star_data,
-        repo_data,
-        contrib_data,
-        follower_data,
-        total_loc[:-1],
+    svg_templates_render(
+        SVG_TEMPLATES,
+        {
+            "age": age_data,
+            "repos": repo_data,
+            "contrib": contrib_data,
+            "commits": commit_data,
+            "stars": star_data,
+            "followers": follower_data,
+            "loc_total": total_loc[2],
+            "loc_add": total_loc[0],
+            "loc_del": total_loc[1],
+            "commits_week": "{:,}".format(
+                history_delta(
+                    "commits",
+                    int(time.time()) - 7 * 24 * 3600,
+                    stats["commits"],
+                )
+            ),
+        },
     )
 
-    # move cursor to override 'Calculation times:' with 'Total function time:' and the total function time, then move cursor back
+    # move cursor to override 'Calculation times:' with 'Critical path time:' and the end-to-end time
+    # of the slowest dependency chain, then move cursor back
+    lines = 2 + len(task_times)  # fingerprint, age calculation and every task
     print(
-        "\033[F\033[F\033[F\033[F\033[F\033[F\033[F\033[F",
-        "{:<21}".format("Total function time:"),
+        "\033[F" * lines,
+        "{:<21}".format("Critical path time:"),
         "{:>11}".format(
-            "%.4f"
-            % (
-                user_time
-                + age_time
-                + loc_time
-                + commit_time
-                + star_time
-                + repo_time
-                + contrib_time
-            )
+            "%.4f" % (fingerprint_time + age_time + critical_time)
         ),
-        " s \033[E\033[E\033[E\033[E\033[E\033[E\033[E\033[E",
+        " s " + "\033[E" * lines,
         sep="",
     )
+    # Only record the run and remember the fingerprint once the card and cache are fully updated
+    history_append(stats)
+    fingerprint_writer(fingerprint)
+    page_size_writer()
 
-    print(
-        "Total GitHub GraphQL API calls:",
-        "{:>3}".format(sum(QUERY_COUNT.values())),
-    )
-    for funct_name, count in QUERY_COUNT.items():
-        print("{:<28}".format("   " + funct_name + ":"), "{:>6}".format(count))
+    query_count_report()